@@ -1,31 +1,40 @@
-import random
+import csv
+import heapq
 import math
-import pandas as pd
+import os
+import random
+from collections import defaultdict
+import numpy as np
 import pulp
+from numba import njit, prange
+
+# Number of random draws the SA kernel generates at a time
+RNG_BATCH = 1 << 16
+
+# Number of independent annealing chains; fixed so a seed gives the same teams on any machine,
+# prange spreads the chains over however many cores there are
+NUM_RESTARTS = 8
 
 class Player:
+    # Players hash by identity (they are dict keys and team members), slots drop the per-instance __dict__
+    __slots__ = ('name', 'rating')
+    
     def __init__(self, name, rating):
         self.name = name
-        self.rating = rating
+        self.rating = int(rating)  # The SA kernel works on integer ratings
         
     def pretty_print(self):
         print(f"Player: {self.name}, Rating: {self.rating}")
 
 class Team:
+    __slots__ = ('players',)
+    
     def __init__(self, players):
-        self.players = set(players)
+        self.players = list(players)  # Teams are small, a list keeps a stable order for sampling and printing
     
     def current_score(self):
         return sum(player.rating for player in self.players)
 
-    def swap_players(self, new, old):
-        if old in self.players:
-            self.players.remove(old)  # Remove the old player
-            self.players.add(new)     # Add the new player
-
-    def contains_any(self, players):
-        return any(player in self.players for player in players)
-        
     def pretty_print(self):
         print(f"Team!")
         for player in self.players:
@@ -33,16 +42,15 @@ class Team:
         
 class PlayerPool:
     def __init__(self):
-        self.players = set()
+        self.players = []  # List keeps insertion order, so runs are reproducible
+        self._by_name = {}
         
     def add(self, player):
-        self.players.add(player)
+        self.players.append(player)
+        self._by_name[player.name.lower()] = player
         
     def look_up_by_name(self, name):
-        for player in self.players:
-            if player.name.lower() == name.lower():
-                return player
-        return None  # Return None if no player is found
+        return self._by_name.get(name.lower())  # Return None if no player is found
         
     def get_as_list(self):
         return list(self.players)
@@ -55,36 +63,20 @@ def print_teams(teams):
     print("-----------")
     
 def load_players(file_path):
-    df = pd.read_csv(file_path)
     players = PlayerPool()
-    for _, row in df.iterrows():
-        players.add(Player(row['Name'], int(row['Rating'])))
+    with open(file_path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            players.add(Player(row['Name'], int(float(row['Rating']))))  # Ratings like 7.0 are truncated to 7
     return players
 
-# Function to calculate the imbalance (objective function)
-def calculate_imbalance(teams):
-    team_scores = [team.current_score() for team in teams]
-    return max(team_scores) - min(team_scores)
-
-# Function to randomly swap players between teams, ensuring constraints are respected
-def swap_between_teams(teams, together_constraints, apart_constraints):
-    team_a, team_b = random.sample(teams, 2)
-    player_a = random.choice(list(team_a.players))
-    player_b = random.choice(list(team_b.players))
-
-    # Ensure swapping maintains "together" constraints
-    if any(set(c).issubset(team_a.players) for c in together_constraints):
-        return
-    if any(set(c).issubset(team_b.players) for c in together_constraints):
-        return
-
-    # Ensure swapping maintains "apart" constraints
-    if team_a.contains_any(apart_constraints.get(player_a, [])) or team_b.contains_any(apart_constraints.get(player_b, [])):
-        return
-
-    # Swap players between the two teams
-    team_a.swap_players(player_b, player_a)
-    team_b.swap_players(player_a, player_b)
+# Function to mirror the apart constraints, giving a player -> frozenset of players dict that holds both directions
+def symmetric_apart(apart_constraints):
+    apart = defaultdict(set)
+    for player, players_not_with in apart_constraints.items():
+        for other in players_not_with:
+            apart[player].add(other)
+            apart[other].add(player)
+    return {player: frozenset(others) for player, others in apart.items()}
 
 # Function to initialize teams, ensuring initial constraints
 def initialize_teams(players, num_teams, together_constraints):
@@ -97,7 +89,7 @@ def initialize_teams(players, num_teams, together_constraints):
         group_set = set(group)
         if assigned & group_set:
             continue  # Skip if already assigned
-        teams.append(Team(group_set))
+        teams.append(Team(dict.fromkeys(group)))  # Drop repeated players, keeping the group's order
         assigned.update(group_set)
     
     # Calculate the size for each team
@@ -114,7 +106,7 @@ def initialize_teams(players, num_teams, together_constraints):
         while current_team_size < target_size and remaining_players:
             if i >= len(teams):
                 teams.append(Team([]))  # Create new team if needed
-            teams[i].players.add(remaining_players.pop())
+            teams[i].players.append(remaining_players.pop())
             current_team_size += 1
 
         if extra_players > 0:
@@ -122,76 +114,313 @@ def initialize_teams(players, num_teams, together_constraints):
 
     # Ensure exactly num_teams are returned
     if len(teams) > num_teams:
-        # Merge smaller teams if needed
-        while len(teams) > num_teams:
-            smallest_team = min(teams, key=lambda t: len(t.players))
-            second_smallest_team = min([t for t in teams if t != smallest_team], key=lambda t: len(t.players))
-            second_smallest_team.players.update(smallest_team.players)
-            teams.remove(smallest_team)
+        # Merge smaller teams if needed, popping the two smallest off a heap of (size, position, team)
+        heap = [(len(team.players), i, team) for i, team in enumerate(teams)]
+        heapq.heapify(heap)
+        while len(heap) > num_teams:
+            _, _, smallest_team = heapq.heappop(heap)
+            _, i, second_smallest_team = heapq.heappop(heap)
+            second_smallest_team.players.extend(smallest_team.players)
+            heapq.heappush(heap, (len(second_smallest_team.players), i, second_smallest_team))
+        teams = [team for _, _, team in sorted(heap, key=lambda entry: entry[1])]
 
     return teams
 
+# Bitmasks over player indices, one row of 64-bit words per group; player i is bit i % 64 of word i // 64
+def player_masks(groups, num_players):
+    masks = np.zeros((len(groups), (num_players + 63) // 64), dtype=np.uint64)
+    for g, group in enumerate(groups):
+        for i in group:
+            masks[g, i // 64] |= np.uint64(1) << np.uint64(i % 64)
+    return masks
+
+# True if the team holds a complete "together" group, such teams are never swapped
+@njit(cache=True)
+def _team_locked(team, team_masks, together_masks):
+    for g in range(together_masks.shape[0]):
+        complete = True
+        for w in range(team_masks.shape[1]):
+            if (team_masks[team, w] & together_masks[g, w]) != together_masks[g, w]:
+                complete = False
+                break
+        if complete:
+            return True
+    return False
+
+# True if moving the player onto the team (in exchange for partner) puts them with someone they must stay apart from
+@njit(cache=True)
+def _apart_blocked(player, team, partner, team_masks, apart_masks, player_words, player_bits):
+    for w in range(team_masks.shape[1]):
+        conflict = apart_masks[player, w] & team_masks[team, w]
+        if w == player_words[partner]:
+            conflict &= ~player_bits[partner]
+        if conflict != 0:
+            return True
+    return False
+
+# Simulated Annealing kernel over player indices
+# ratings[p] is the rating of player p, assignment[p] its team, members[t, :team_sizes[t]] the players
+# of team t and slots[p] the position of player p in that row. team_masks[t] is the bitmask of team t,
+# player p being bit player_bits[p] of word player_words[p] (see player_masks).
+# Mutates assignment, members, slots, team_masks and team_scores.
+@njit(cache=True)
+def _sa_kernel(ratings, assignment, members, slots, team_sizes, team_scores, team_masks,
+               player_words, player_bits, together_masks, apart_masks,
+               initial_temp, cooling_rate, num_iters, seed):
+    if seed >= 0:
+        np.random.seed(seed)
+    num_teams = len(team_scores)
+    current_imbalance = team_scores.max() - team_scores.min()
+    best_imbalance = current_imbalance
+    best_assignment = assignment.copy()
+
+    # Whether each team holds a complete "together" group. Locked teams are never swapped, so this
+    # only changes when an accepted swap completes a group and is refreshed for those two teams only
+    locked = np.empty(num_teams, dtype=np.bool_)
+    for t in range(num_teams):
+        locked[t] = _team_locked(t, team_masks, together_masks)
+    temp = initial_temp
+
+    # Random draws are generated in batches and consumed by index: two team indices,
+    # then two uniforms to pick a player from each team and one for the acceptance test
+    rand_teams = np.empty((RNG_BATCH, 2), dtype=np.int64)
+    rand_uniform = np.empty((RNG_BATCH, 3))
+    k = RNG_BATCH
+
+    for _ in range(num_iters):
+        if k == RNG_BATCH:
+            rand_teams[:, 0] = np.random.randint(0, num_teams, RNG_BATCH)
+            rand_teams[:, 1] = np.random.randint(0, num_teams - 1, RNG_BATCH)
+            rand_uniform[:] = np.random.random((RNG_BATCH, 3))
+            k = 0
+
+        # Pick two distinct teams and a player from each
+        a = rand_teams[k, 0]
+        b = rand_teams[k, 1]
+        if b >= a:
+            b += 1
+
+        if team_sizes[a] > 0 and team_sizes[b] > 0 and not locked[a] and not locked[b]:
+            player_a = members[a, int(rand_uniform[k, 0] * team_sizes[a])]
+            player_b = members[b, int(rand_uniform[k, 1] * team_sizes[b])]
+
+            if (not _apart_blocked(player_a, b, player_b, team_masks, apart_masks, player_words, player_bits)
+                    and not _apart_blocked(player_b, a, player_a, team_masks, apart_masks, player_words, player_bits)):
+                # Score the swap before making it: only teams a and b change
+                delta = ratings[player_b] - ratings[player_a]
+                score_a = team_scores[a] + delta
+                score_b = team_scores[b] - delta
+                high = max(score_a, score_b)
+                low = min(score_a, score_b)
+                for t in range(num_teams):
+                    if t != a and t != b:
+                        high = max(high, team_scores[t])
+                        low = min(low, team_scores[t])
+                new_imbalance = high - low
+
+                # Decide whether to accept the new solution (exp is only evaluated for uphill moves),
+                # and only then swap the players between the two teams
+                if new_imbalance < current_imbalance or rand_uniform[k, 2] < math.exp((current_imbalance - new_imbalance) / temp):
+                    slot_a = slots[player_a]
+                    slot_b = slots[player_b]
+                    members[a, slot_a] = player_b
+                    members[b, slot_b] = player_a
+                    slots[player_a] = slot_b
+                    slots[player_b] = slot_a
+                    assignment[player_a] = b
+                    assignment[player_b] = a
+                    team_masks[a, player_words[player_a]] ^= player_bits[player_a]
+                    team_masks[a, player_words[player_b]] ^= player_bits[player_b]
+                    team_masks[b, player_words[player_a]] ^= player_bits[player_a]
+                    team_masks[b, player_words[player_b]] ^= player_bits[player_b]
+                    team_scores[a] = score_a
+                    team_scores[b] = score_b
+                    current_imbalance = new_imbalance
+                    locked[a] = _team_locked(a, team_masks, together_masks)
+                    locked[b] = _team_locked(b, team_masks, together_masks)
+
+                    # Update the best solution found so far
+                    if current_imbalance < best_imbalance:
+                        best_imbalance = current_imbalance
+                        best_assignment[:] = assignment
+
+        k += 1
+
+        # Cool down the temperature
+        temp *= cooling_rate
+
+    return best_imbalance, best_assignment
+
+# Run n_restarts independent kernel chains in parallel from the same starting teams, chain k seeded with seed + k
+@njit(parallel=True, cache=True)
+def _sa_multi_start(ratings, assignment, members, slots, team_sizes, team_scores, team_masks,
+                    player_words, player_bits, together_masks, apart_masks,
+                    initial_temp, cooling_rate, num_iters, seed, n_restarts):
+    best_imbalances = np.empty(n_restarts, dtype=np.int64)
+    best_assignments = np.empty((n_restarts, len(assignment)), dtype=np.int8)
+    for k in prange(n_restarts):
+        chain_seed = seed + k if seed >= 0 else -1
+        imbalance, best_assignment = _sa_kernel(ratings, assignment.copy(), members.copy(), slots.copy(), team_sizes,
+                                                team_scores.copy(), team_masks.copy(),
+                                                player_words, player_bits, together_masks, apart_masks,
+                                                initial_temp, cooling_rate, num_iters, chain_seed)
+        best_imbalances[k] = imbalance
+        best_assignments[k] = best_assignment
+    return best_imbalances, best_assignments
+
 # Simulated Annealing algorithm
-def simulated_annealing(players, num_teams=10, together_constraints=[], apart_constraints={}, initial_temp=1000000, cooling_rate=0.00001, min_temp=0.00001):
+def simulated_annealing(players, num_teams=10, together_constraints=[], apart_constraints={}, initial_temp=1000000, cooling_rate=0.9995, min_temp=0.00001, max_iters=None, seed=None, n_restarts=NUM_RESTARTS):
+    # Geometric cooling from initial_temp down to min_temp, run for a fixed number of iterations.
+    # max_iters sets the iteration budget and derives the cooling rate from it.
+    if max_iters is not None:
+        if max_iters <= 0:
+            raise ValueError(f"max_iters must be positive, got {max_iters}")
+        cooling_rate = (min_temp / initial_temp) ** (1 / max_iters)
+        num_iters = max_iters
+    elif 0 < cooling_rate < 1:
+        num_iters = math.ceil(math.log(min_temp / initial_temp) / math.log(cooling_rate))
+    else:
+        raise ValueError(f"cooling_rate must be between 0 and 1, got {cooling_rate}")
+    
+    # Seed both the team initialization and the kernel for reproducible runs
+    if seed is not None:
+        random.seed(seed)
+    
     # Initialize teams with constraints
     teams = initialize_teams(players, num_teams, together_constraints)
     
-    current_imbalance = calculate_imbalance(teams)
-    best_teams = [Team(set(team.players)) for team in teams]  # Deep copy of teams
-    best_imbalance = current_imbalance
-    temp = initial_temp
+    # Translate the teams and constraints into arrays indexed by player
+    index = {player: i for i, player in enumerate(players)}
+    ratings = np.array([player.rating for player in players], dtype=np.int32)
+    assignment = np.full(len(players), -1, dtype=np.int8)
+    slots = np.empty(len(players), dtype=np.int32)
+    team_sizes = np.array([len(team.players) for team in teams], dtype=np.int32)
+    team_scores = np.array([team.current_score() for team in teams], dtype=np.int64)
+    members = np.full((num_teams, team_sizes.max()), -1, dtype=np.int32)
+    for t, team in enumerate(teams):
+        for slot, player in enumerate(team.players):
+            assignment[index[player]] = t
+            slots[index[player]] = slot
+            members[t, slot] = index[player]
+    if team_sizes.sum() != len(players) or (assignment < 0).any():
+        raise ValueError("initial teams must hold every player exactly once")
     
-    while temp > min_temp:
-        # Create a new candidate solution by swapping players between teams
-        new_teams = [Team(set(team.players)) for team in teams]  # Copy current teams
-        swap_between_teams(new_teams, together_constraints, apart_constraints)
-        
-        # Calculate the new imbalance
-        new_imbalance = calculate_imbalance(new_teams)
-        
-        # Decide whether to accept the new solution
-        if new_imbalance < current_imbalance or random.random() < math.exp((current_imbalance - new_imbalance) / temp):
-            teams = new_teams
-            current_imbalance = new_imbalance
-            
-            # Update the best solution found so far
-            if current_imbalance < best_imbalance:
-                best_teams = [Team(set(team.players)) for team in teams]
-                best_imbalance = current_imbalance
-        
-        # Cool down the temperature
-        temp *= cooling_rate
+    player_ids = np.arange(len(players))
+    player_words = (player_ids // 64).astype(np.int32)
+    player_bits = np.uint64(1) << (player_ids % 64).astype(np.uint64)
+    team_masks = player_masks([[index[player] for player in team.players] for team in teams], len(players))
+    together_masks = player_masks([[index[player] for player in group] for group in together_constraints], len(players))
+    
+    # Apart constraints apply both ways
+    apart = symmetric_apart(apart_constraints)
+    apart_masks = player_masks([[index[other] for other in apart.get(player, ())] for player in players], len(players))
+    
+    best_imbalances, best_assignments = _sa_multi_start(ratings, assignment, members, slots, team_sizes, team_scores, team_masks,
+                                                        player_words, player_bits, together_masks, apart_masks,
+                                                        float(initial_temp), float(cooling_rate), num_iters,
+                                                        -1 if seed is None else seed, n_restarts)
+    
+    # Keep the best chain
+    best = best_imbalances.argmin()
+    best_imbalance, best_assignment = best_imbalances[best], best_assignments[best]
+    
+    best_teams = [Team([]) for _ in range(num_teams)]
+    for i, t in enumerate(best_assignment):
+        best_teams[t].players.append(players[i])
+    return best_teams, int(best_imbalance)
     
-    return best_teams, best_imbalance
+# ILP solver used when none is passed in: Gurobi if it is installed, CBC otherwise.
+# Set PULP_SOLVER=gurobi or PULP_SOLVER=cbc to pick one explicitly.
+# warm_start makes the solver start from the variables' initial values.
+def default_solver(time_limit=300, warm_start=False):
+    threads = os.cpu_count()
+    choice = os.environ.get('PULP_SOLVER', '').lower()
+    if choice != 'cbc':
+        gurobi = pulp.GUROBI_CMD(timeLimit=time_limit, threads=threads, warmStart=warm_start)
+        if choice == 'gurobi' or gurobi.available():
+            return gurobi
+    return pulp.PULP_CBC_CMD(timeLimit=time_limit, threads=threads, presolve=True, warmStart=warm_start)
+
+# Imbalance of a team allocation (lists of players) if it satisfies every ILP constraint, None otherwise
+def allocation_imbalance(teams, players, min_team_size, max_team_size, together_constraints, apart_constraints):
+    where = {player: t for t, team in enumerate(teams) for player in team}
+    if sum(len(team) for team in teams) != len(players) or any(player not in where for player in players):
+        return None
+    if any(not min_team_size <= len(team) <= max_team_size for team in teams):
+        return None
+    if any(len({where[player] for player in group}) > 1 for group in together_constraints):
+        return None
+    if any(where[player1] == where[player2] for player1, players_not_with in apart_constraints.items() for player2 in players_not_with):
+        return None
+    scores = [sum(player.rating for player in team) for team in teams]
+    return max(scores) - min(scores)
+
+# Collapse the together groups into "atoms", lists of players that always share a team
+# (overlapping groups are merged); every other player is an atom of their own
+def player_atoms(players, together_constraints):
+    atom_of = {}
+    for group in together_constraints:
+        atom = []
+        for player in group:
+            existing = atom_of.get(player)
+            if existing is None:
+                atom.append(player)
+                atom_of[player] = atom
+            elif existing is not atom:
+                for other in existing:
+                    atom.append(other)
+                    atom_of[other] = atom
+                existing.clear()
     
-def ilp_team_allocation(player_pool, num_teams, together_constraints, apart_constraints):
+    atoms = []
+    seen = set()
+    for player in players:
+        atom = atom_of.get(player, [player])
+        if id(atom) not in seen:
+            seen.add(id(atom))
+            atoms.append(atom)
+    return atoms
+
+# initial_teams (lists of players, e.g. the SA result) is used as a warm start when it satisfies the constraints.
+# Returns None if no allocation is found.
+def ilp_team_allocation(player_pool, num_teams, together_constraints, apart_constraints, solver=None, initial_teams=None):
     players = player_pool.get_as_list()
     
+    # Together groups are assigned as a single atom, so they need no constraints of their own
+    atoms = player_atoms(players, together_constraints)
+    atom_index = {player: i for i, atom in enumerate(atoms) for player in atom}
+    atom_ratings = [sum(player.rating for player in atom) for atom in atoms]
+    
     # Define the problem
     prob = pulp.LpProblem("TeamAssignment", pulp.LpMinimize)
 
     # Create variables
-    x = pulp.LpVariable.dicts("PlayerTeam",
-                              ((player.name, team) for player in players for team in range(num_teams)),
+    x = pulp.LpVariable.dicts("AtomTeam",
+                              ((i, team) for i in range(len(atoms)) for team in range(num_teams)),
                               cat='Binary')
 
 
-    # Variables for maximum and minimum team scores to minimize the difference
-    max_score = pulp.LpVariable("max_score", lowBound=0)
-    min_score = pulp.LpVariable("min_score", lowBound=0)
+    # Variables for maximum and minimum team scores to minimize the difference (integer, as ratings are)
+    max_score = pulp.LpVariable("max_score", lowBound=0, cat='Integer')
+    min_score = pulp.LpVariable("min_score", lowBound=0, cat='Integer')
 
     # Objective function: Minimize the difference between the maximum and minimum team scores
     prob += max_score - min_score
 
     # Calculate team scores and relate them to max and min scores
-    team_scores = [pulp.lpSum(x[player.name, t] * player.rating for player in players) for t in range(num_teams)]
+    # (expressions are built straight from (variable, coefficient) pairs, which is much cheaper than lpSum)
+    team_scores = [pulp.LpAffineExpression((x[i, t], atom_ratings[i]) for i in range(len(atoms))) for t in range(num_teams)]
     for t in range(num_teams):
-        prob += team_scores[t] <= max_score
-        prob += team_scores[t] >= min_score
+        prob += pulp.LpConstraint(team_scores[t] - max_score, pulp.LpConstraintLE)
+        prob += pulp.LpConstraint(team_scores[t] - min_score, pulp.LpConstraintGE)
 
-    # Constraint: Every player is assigned to exactly one team
-    for player in players:
-        prob += pulp.lpSum(x[player.name, t] for t in range(num_teams)) == 1
+    # Break the team relabelling symmetry: teams are ordered by non-increasing score
+    for t in range(num_teams - 1):
+        prob += pulp.LpConstraint(team_scores[t] - team_scores[t + 1], pulp.LpConstraintGE)
+
+    # Constraint: Every atom is assigned to exactly one team
+    for i in range(len(atoms)):
+        prob += pulp.LpConstraint(pulp.LpAffineExpression((x[i, t], 1) for t in range(num_teams)), pulp.LpConstraintEQ, rhs=1)
 
     # Constraint: Each team has approximately the same number of players
     total_players = len(players)
@@ -199,31 +428,48 @@ def ilp_team_allocation(player_pool, num_teams, together_constraints, apart_cons
     max_team_size = min_team_size + (1 if total_players % num_teams != 0 else 0)
     
     for t in range(num_teams):
-        prob += pulp.lpSum(x[player.name, t] for player in players) >= min_team_size
-        prob += pulp.lpSum(x[player.name, t] for player in players) <= max_team_size
-
-    # Together constraints
-    for group in together_constraints:
+        team_size = pulp.LpAffineExpression((x[i, t], len(atom)) for i, atom in enumerate(atoms))
+        prob += pulp.LpConstraint(team_size, pulp.LpConstraintGE, rhs=min_team_size)
+        prob += pulp.LpConstraint(team_size, pulp.LpConstraintLE, rhs=max_team_size)
+
+    # Apart constraints (players in a together group go through their group's atom), one per pair of atoms
+    apart_atoms = {tuple(sorted((atom_index[player1], atom_index[player2])))
+                   for player1, players_not_with in symmetric_apart(apart_constraints).items()
+                   for player2 in players_not_with}
+    for atom1, atom2 in sorted(apart_atoms):
         for t in range(num_teams):
-            prob += sum(x[player.name, t] for player in group) == len(group) * x[next(iter(group)).name, t]
-
-    # Apart constraints
-    for apart_group in apart_constraints.items():
-        player1, players_not_with = apart_group
-        for player2 in players_not_with:
-            for t in range(num_teams):
-                prob += x[player1.name, t] + x[player2.name, t] <= 1
+            prob += x[atom1, t] + x[atom2, t] <= 1
+
+    # Warm start: seed the variables with the initial teams and bound the objective by their imbalance
+    start_imbalance = None
+    if initial_teams is not None and len(initial_teams) == num_teams:
+        start_imbalance = allocation_imbalance(initial_teams, players, min_team_size, max_team_size,
+                                               together_constraints, apart_constraints)
+    if start_imbalance is not None:
+        # Relabel the teams by non-increasing score to match the symmetry-breaking constraints
+        start_teams = sorted(initial_teams, key=lambda team: sum(player.rating for player in team), reverse=True)
+        for t, team in enumerate(start_teams):
+            for player in team:
+                for u in range(num_teams):
+                    x[atom_index[player], u].setInitialValue(1 if u == t else 0)
+        max_score.setInitialValue(sum(player.rating for player in start_teams[0]))
+        min_score.setInitialValue(sum(player.rating for player in start_teams[-1]))
+        prob += pulp.LpConstraint(max_score - min_score, pulp.LpConstraintLE, rhs=start_imbalance)
 
     # Solve the problem
-    prob.solve(pulp.PULP_CBC_CMD(timeLimit=300))
+    prob.solve(solver or default_solver(warm_start=start_imbalance is not None))
+    
+    # Return None if the solver found no allocation (e.g. the constraints are infeasible)
+    if prob.sol_status not in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible):
+        return None
     
     # Assign players to teams
+    values = np.fromiter((x[i, t].varValue or 0 for i in range(len(atoms)) for t in range(num_teams)),
+                         dtype=np.float32, count=len(atoms) * num_teams)
+    assignments = values.reshape(len(atoms), num_teams).argmax(axis=1)
     teams = [[] for _ in range(num_teams)]
-    for player in players:
-        for t in range(num_teams):
-            if pulp.value(x[player.name, t]) == 1:
-                teams[t].append(player)
-                break
+    for atom, t in zip(atoms, assignments):
+        teams[t].extend(atom)
 
     return teams
 
@@ -256,7 +502,11 @@ def main():
     
     # Run the ILP team allocation
     num_teams = 10
-    teams = ilp_team_allocation(players, num_teams, together_constraints, apart_constraints)
+    teams = ilp_team_allocation(players, num_teams, together_constraints, apart_constraints,
+                                initial_teams=[team.players for team in best_teams])
+    if teams is None:
+        print("ILP found no team allocation, check the constraints")
+        return
     
     # Print the teams and their total ratings
     for i, team in enumerate(teams, 1):